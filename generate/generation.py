@@ -8,7 +8,10 @@ import os
 import chromadb
 from ollama import chat
 from datetime import datetime
-from lib.utils import convert_rag_to_string, write_to_file
+from typing import List, Optional, Tuple
+from lib.utils import convert_rag_to_string
+from lib.chunk_index import ChunkIndex, parse_chunk_id
+from lib.sinks import report_path, Sink, FileSink, JsonlSink, MultiSink, TerminalSink, ThinkFilter
 from .prompts import STRUCTURE_PROMPT, CONTEXT_PROMPT, GENERATE_PROMPT 
 
 
@@ -24,19 +27,34 @@ class Generator:
         client (chromadb.PersistentClient): ChromaDB client instance
         collection (chromadb.Collection): ChromaDB collection for context retrieval
         user_prompt (str): The user's input prompt for generation
+        event_log (bool): Whether to log every generated token to a JSONL file next to the report
+        report_file (str): Path the report of the current generation is streamed to
+        neighbours (int): Number of neighbouring chunks added on each side of every retrieved chunk
+        passages (bool): Whether to expand every retrieved chunk to its enclosing passage
+        chunk_index (ChunkIndex): Positional index of the collection's chunks
     """
 
-    def __init__(self, user_prompt: str, collection_name: str) -> None:
+    def __init__(self, user_prompt: str, collection_name: str, event_log: bool = False,
+                 neighbours: int = 0, passages: bool = False) -> None:
         """
         Initialize the Generator with a prompt and collection name.
 
         Args:
             user_prompt: The prompt to generate content for
             collection_name: Name of the ChromaDB collection to use
+            event_log: Whether to log every generated token to a JSONL file next to the report
+            neighbours: Number of neighbouring chunks added on each side of every retrieved chunk
+            passages: Whether to expand every retrieved chunk to its enclosing passage
         """
         self.client = chromadb.PersistentClient()
         self.collection = self.client.get_collection(name=collection_name)
         self.user_prompt = user_prompt
+        self.event_log = event_log
+        self.report_file = None
+        self._event_file = None
+        self.neighbours = neighbours
+        self.passages = passages
+        self.chunk_index = ChunkIndex.from_json(self.collection.metadata.get("chunk_index"))
     
     def get_even_context(self, results_per_file: int, query: str) -> str:
         processed_files = self.collection.metadata["processed_files"].split("###")
@@ -51,22 +69,85 @@ class Generator:
             )
             all_contexts.append(file_context)
         
+        ids = sum([chunk["ids"][0] for chunk in all_contexts], [])
+        documents = sum([chunk["documents"][0] for chunk in all_contexts], [])
+        ids, documents = self.expand_context(ids, documents)
+
         combined_context = {
-            "ids": [sum([chunk["ids"][0] for chunk in all_contexts], [])],
-            "documents": [sum([chunk["documents"][0] for chunk in all_contexts], [])]
+            "ids": [ids],
+            "documents": [documents]
         }
         
         context_string = convert_rag_to_string(combined_context)
 
         return context_string
+
+    def expand_context(self, ids: List[str], documents: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Expands retrieved chunks with their neighbours and/or enclosing passages.
+
+        Args:
+            ids (list): IDs of the retrieved chunks
+            documents (list): Text of the retrieved chunks
+
+        Returns:
+            tuple: The expanded chunk IDs and texts, each hit followed in document order by
+                its surrounding chunks, without duplicates
+
+        Note:
+            Surrounding chunks are found through the positional chunk index and fetched by ID,
+            so no extra embedding or vector search is needed
+        """
+        if not self.neighbours and not self.passages:
+            return ids, documents
+
+        expanded = []
+        seen = set()
+        for chunk in ids:
+            group = {chunk}
+            group.update(self.chunk_index.neighbours(chunk, self.neighbours))
+            if self.passages:
+                group.update(self.chunk_index.passage(chunk))
+            for member in sorted(group, key=lambda member: parse_chunk_id(member)[1]):
+                if member not in seen:
+                    seen.add(member)
+                    expanded.append(member)
+
+        texts = dict(zip(ids, documents))
+        missing = [member for member in expanded if member not in texts]
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents"])
+            texts.update(zip(fetched["ids"], fetched["documents"]))
+
+        expanded = [member for member in expanded if member in texts]
+        return expanded, [texts[member] for member in expanded]
     
 
     def generate(self) -> str:
         """
         Executes the steps to process the user's prompt and generate the final report,
         ensuring equal context from each source document.
-        """
 
+        The report is streamed to a timestamped file in the 'reports' directory as it is
+        generated. If event logging is enabled, every step's tokens are also logged to a
+        JSONL file with the same name.
+        """
+        self.report_file = report_path()
+        if self.event_log:
+            event_path = os.path.splitext(self.report_file)[0] + ".jsonl"
+            self._event_file = open(event_path, "w", encoding="utf-8")
+
+        try:
+            self._generate_steps()
+        finally:
+            if self._event_file is not None:
+                self._event_file.close()
+                self._event_file = None
+
+    def _generate_steps(self) -> None:
+        """
+        Runs the retrieval and generation steps, from the outline to the final report.
+        """
         processed_files = " ".join(self.collection.metadata["processed_files"].split("###"))
         
         context_string = self.get_even_context(1, self.user_prompt)
@@ -82,14 +163,7 @@ class Generator:
 
         more_context_string = self.get_even_context(1, context_response)
 
-        report = self.generate_report(structure, context_response, context_string, more_context_string, processed_files)
-
-        marker = "</think>"
-        index = report.find(marker)
-        if index != -1:
-            report = report[index + len(marker):]
-        
-        write_to_file(report)
+        self.generate_report(structure, context_response, context_string, more_context_string, processed_files)
     
     def generate_template_response(self, user_context: str, files: str) -> str:
         """
@@ -108,20 +182,7 @@ class Generator:
         structure_prompt = structure_prompt.replace("{USER_CONTEXT}", user_context)
         structure_prompt = structure_prompt.replace("{FILENAMES}", files)
 
-        stream = chat(
-            model='deepseek-r1:8b',
-            messages=[{'role': 'user', 'content': structure_prompt}],
-            stream=True,
-        )
-        response = ""
-
-        for chunk in stream:
-            response += chunk['message']['content']
-            print(chunk['message']['content'], end='', flush=True)
-        print("\n\n\n")
-        
-    
-        return response
+        return self._stream(structure_prompt, "structure")
 
 
     def generate_context_response(self, structure: str, files: str) -> str:
@@ -141,21 +202,7 @@ class Generator:
         context_prompt = context_prompt.replace("{USER_PROMPT}", self.user_prompt.strip())
         context_prompt = context_prompt.replace("{FILENAMES}", files)
 
-        stream = chat(
-            model='deepseek-r1:8b',
-            messages=[{'role': 'user', 'content': context_prompt}],
-            stream=True,
-        )
-
-        response = ""
-
-        for chunk in stream:
-            response += chunk['message']['content']
-            print(chunk['message']['content'], end='', flush=True)
-        print("\n\n\n")
-        
-
-        return response
+        return self._stream(context_prompt, "context")
 
     
 
@@ -172,7 +219,8 @@ class Generator:
             str: The complete generated report
 
         Note:
-            Uses the DeepSeek-R1 8B model for generation with streaming output
+            Uses the DeepSeek-R1 8B model for generation with streaming output.
+            The report is appended to the report file as it streams, without its '<think>' section.
         """
         final_prompt = GENERATE_PROMPT.replace("{USER_PROMPT}", self.user_prompt)
         final_prompt = final_prompt.replace("{STRUCTURE}", structure)
@@ -181,22 +229,41 @@ class Generator:
         final_prompt = final_prompt.replace("{MORE_CONTEXT}", more_context)
         final_prompt = final_prompt.replace("{FILENAMES}", files)
 
+        report_sink = ThinkFilter(FileSink(self.report_file or report_path()))
+        return self._stream(final_prompt, "report", [report_sink])
+
+    def _stream(self, prompt: str, step: str, sinks: Optional[List[Sink]] = None) -> str:
+        """
+        Streams a model response to the terminal and any extra sinks.
+
+        Args:
+            prompt (str): The prompt sent to the model
+            step (str): Name of the generation step, used in the event log
+            sinks (list, optional): Additional sinks receiving the tokens
+
+        Returns:
+            str: The complete response
+        """
+        sink = MultiSink([TerminalSink()] + (sinks or []))
+        if self._event_file is not None:
+            sink.sinks.append(JsonlSink(self._event_file, step))
+
         stream = chat(
             model='deepseek-r1:8b',
-            messages=[{'role': 'user', 'content': final_prompt}],
+            messages=[{'role': 'user', 'content': prompt}],
             stream=True,
         )
 
-        response = ""
-
-        for chunk in stream:
-            response += chunk['message']['content']
-            print(chunk['message']['content'], end='', flush=True)
+        parts = []
+        try:
+            for chunk in stream:
+                token = chunk['message']['content']
+                parts.append(token)
+                sink.write(token)
+        finally:
+            sink.close()
 
-        print("\n\n\n")
-        
-    
-        return response
+        return "".join(parts)
 
 
 
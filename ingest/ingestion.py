@@ -1,18 +1,23 @@
 """
 This module provides functionality for ingesting various document formats into a ChromaDB vector database.
 It supports PDF, EPUB, DOCX, TXT, and XML files with automatic text chunking and progress tracking.
+Extraction, splitting, embedding and writing run as concurrent pipeline stages.
 Documents are processed and stored in a vector database for efficient retrieval and searching.
 """
 
 import os
 import time
+import multiprocessing
 import chromadb
+from chromadb.utils import embedding_functions
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from lib.utils import extract_text_from_pdf, extract_text_from_epub, extract_text_from_docx
+from lib.chunk_index import ChunkIndex, chunk_id
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from bs4 import BeautifulSoup
-from tqdm import tqdm
-from typing import Set, List, Any
+from typing import Set, List, Any, Dict, Iterator, Tuple
+from .pipeline import Pipeline
 
 
 class Ingestor:
@@ -29,23 +34,53 @@ class Ingestor:
         name (str): Name of the ChromaDB collection
         collection (chromadb.Collection): ChromaDB collection for storing documents
         processed_files (set): Set of unique filenames that have been processed
+        extract_workers (int): Number of threads converting files to text
+        split_workers (int): Number of threads splitting text into chunks
+        embed_workers (int): Number of threads embedding chunk batches
+        write_workers (int): Number of threads writing chunk batches to ChromaDB
+        batch_size (int): Number of chunks embedded and written together
+        queue_size (int): Maximum number of items waiting between two pipeline stages
+        chunk_index (ChunkIndex): Positional index of the ingested chunks
+        pdf_workers (int): Number of processes shared by all PDFs for extracting page ranges
     """
 
-    def __init__(self, dir_path, name):
+    def __init__(self, dir_path, name, extract_workers=2, split_workers=1, embed_workers=1, write_workers=1,
+                 batch_size=64, queue_size=8, pdf_workers=None):
         """
         Initialize the Ingestor with a directory path and collection name.
 
         Args:
             dir_path (str): Path to directory containing documents to process
             name (str): Name for the ChromaDB collection
+            extract_workers (int): Number of threads converting files to text
+            split_workers (int): Number of threads splitting text into chunks
+            embed_workers (int): Number of threads embedding chunk batches
+            write_workers (int): Number of threads writing chunk batches to ChromaDB
+            batch_size (int): Number of chunks embedded and written together
+            queue_size (int): Maximum number of items waiting between two pipeline stages
+            pdf_workers (int, optional): Number of processes shared by all PDFs for extracting
+                the pages of large PDFs, defaults to the CPU count capped at 4
 
         Note:
             If a collection with the given name exists, it will be deleted and recreated
-            with current timestamp metadata
+            with current timestamp metadata.
+            PDF worker processes are started with the spawn method, so each one re-imports the
+            CLI entry point and its dependencies (chromadb, langchain, ollama) when it starts
         """
         self.dir = dir_path
         self.client = chromadb.PersistentClient()
         self.name = name
+        self.extract_workers = extract_workers
+        self.split_workers = split_workers
+        self.embed_workers = embed_workers
+        self.write_workers = write_workers
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.pdf_workers = pdf_workers or min(4, os.cpu_count() or 1)
+        self._pdf_executor = None
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=100, add_start_index=True)
+        self.chunk_index = ChunkIndex()
         
         try:
             self.client.delete_collection(name=name)
@@ -57,63 +92,153 @@ class Ingestor:
         """
         Process all supported documents in the specified directory.
 
-        This method:
-        1. Walks through the directory tree
-        2. Identifies supported documents
-        3. Converts them to text
-        4. Splits text into chunks (700 chars with 100 char overlap)
-        5. Stores chunks in ChromaDB with unique IDs
-        6. Displays progress with tqdm progress bars
+        The work runs as a pipeline of stages connected by bounded queues:
+        1. scan: walks the directory tree once, yielding file paths
+        2. extract: converts each file to text
+        3. split: splits text into chunks (700 chars with 100 char overlap) and batches them
+        4. embed: computes embeddings for each batch of chunks
+        5. write: stores the batches in ChromaDB with unique IDs
+
+        Each stage shows its throughput and queue depth while the pipeline runs.
+        Once every file is written, the positional chunk index is stored in the
+        collection metadata for neighbour expansion at retrieval time.
 
         Raises:
             Exception: If no text could be extracted from a file
         """
         print(f"Processing directory: {self.dir}")
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=100)
+        created = str(datetime.now())
         processed_files = set()
 
-        for root, _, files in os.walk(self.dir):
-            for file in files:
-                filepath = os.path.join(root, file)
-                filename = os.path.basename(filepath)
-                processed_files.add(filename.strip())
-
         collection = self.client.create_collection(
             name=self.name, 
-            metadata={
-                "created": str(datetime.now()),
-                "processed_files": "###".join(list(processed_files))
-            }
+            embedding_function=self.embedding_function,
+            metadata={"created": created}
         )
-        
-        for root, _, files in os.walk(self.dir):
-            for file in files:
-                filepath = os.path.join(root, file)
-                text = self.convert_file_to_text(filepath)
-                if text:
-                    chunks = text_splitter.create_documents([text])
-                    filename = os.path.basename(filepath)
-                    
-                    print(f"\nProcessing file: {filename}")
-        
-                    with tqdm(total=len(chunks), desc="Chunks", unit="chunk") as pbar:
-                        for i, chunk in enumerate(chunks):
-                            chunk_id = f"{filename}-chunk-{i}"
-                            # Add metadata about source file for each chunk
-                            collection.add(
-                                documents=[chunk.page_content],
-                                ids=[chunk_id],
-                                metadatas=[{"source_file": filename.strip()}]
-                            )
-                            pbar.update(1)
-                    print(f"Finished processing: {filename}")
-                else:
-                    raise Exception(f"No text found for {filename}")
-        
-        
-        collection.metadata["processed_files"] = "###".join(list(processed_files))
+
+        def scan_directory():
+            for root, _, files in os.walk(self.dir):
+                for file in files:
+                    filepath = os.path.join(root, file)
+                    processed_files.add(os.path.basename(filepath).strip())
+                    yield filepath
+
+        pipeline = Pipeline(queue_size=self.queue_size)
+        pipeline.add_stage("extract", self._extract, workers=self.extract_workers, unit="file")
+        pipeline.add_stage("split", self._split, workers=self.split_workers, unit="file")
+        pipeline.add_stage("embed", self._embed, workers=self.embed_workers, unit="chunk", weight=len)
+        pipeline.add_stage("write", lambda batch: self._write(collection, batch), workers=self.write_workers,
+                           unit="chunk", weight=len)
+        # One pool shared by every PDF bounds the total number of extraction processes.
+        # Processes are spawned rather than forked, as the pipeline's threads are already running.
+        with ProcessPoolExecutor(max_workers=self.pdf_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            self._pdf_executor = executor
+            try:
+                pipeline.run(scan_directory())
+            finally:
+                self._pdf_executor = None
+
+        collection.modify(metadata={
+            "created": created,
+            "processed_files": "###".join(list(processed_files)),
+            "chunk_index": self.chunk_index.to_json()
+        })
         print(f"\nProcessed files: {', '.join(processed_files)}")
 
+    def _extract(self, filepath: str) -> Iterator[Tuple[str, str]]:
+        """
+        Pipeline stage converting a file to text.
+
+        Args:
+            filepath (str): Path to the file to convert
+
+        Yields:
+            tuple: The source filename and the extracted text
+
+        Raises:
+            Exception: If no text could be extracted from the file
+        """
+        filename = os.path.basename(filepath)
+        text = self.convert_file_to_text(filepath)
+        if not text:
+            raise Exception(f"No text found for {filename}")
+        yield filename, text
+
+    def _split(self, document: Tuple[str, str]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Pipeline stage splitting a document into chunks, grouped into batches.
+        The chunk positions are also recorded in the chunk index.
+
+        Args:
+            document (tuple): The source filename and its text
+
+        Yields:
+            list: Batches of chunk records with 'id', 'document' and 'metadata' keys
+        """
+        filename, text = document
+        chunks = self.text_splitter.create_documents([text])
+
+        spans = []
+        for chunk in chunks:
+            start = chunk.metadata.get("start_index", -1)
+            if start < 0:
+                start = spans[-1][1] if spans else 0
+            spans.append((start, start + len(chunk.page_content)))
+        self.chunk_index.add_file(filename, text, spans)
+
+        batch = []
+        for i, (chunk, (start, end)) in enumerate(zip(chunks, spans)):
+            batch.append({
+                "id": chunk_id(filename, i),
+                "document": chunk.page_content,
+                # Add metadata about source file and position for each chunk
+                "metadata": {
+                    "source_file": filename.strip(),
+                    "chunk_index": i,
+                    "start_index": start,
+                    "end_index": end
+                }
+            })
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed(self, batch: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Pipeline stage computing embeddings for a batch of chunks.
+
+        Args:
+            batch (list): Chunk records to embed
+
+        Yields:
+            list: The same records with an added 'embedding' key
+        """
+        embeddings = self.embedding_function([record["document"] for record in batch])
+        for record, embedding in zip(batch, embeddings):
+            record["embedding"] = embedding
+        yield batch
+
+    def _write(self, collection: Any, batch: List[Dict[str, Any]]) -> Iterator[Any]:
+        """
+        Pipeline stage storing a batch of embedded chunks in ChromaDB.
+
+        Args:
+            collection (chromadb.Collection): Collection to add the chunks to
+            batch (list): Embedded chunk records
+
+        Returns:
+            Iterator: An empty iterator, as this is the last stage
+        """
+        collection.add(
+            ids=[record["id"] for record in batch],
+            documents=[record["document"] for record in batch],
+            embeddings=[record["embedding"] for record in batch],
+            metadatas=[record["metadata"] for record in batch]
+        )
+        return iter(())
+
     def convert_file_to_text(self, filepath: str) -> str:
         """
         Convert various document formats to plain text.
@@ -143,7 +268,7 @@ class Ingestor:
         
         try:
             if file_ext == '.pdf':
-                return extract_text_from_pdf(filepath)
+                return extract_text_from_pdf(filepath, executor=self._pdf_executor)
             elif file_ext == '.epub':
                 return extract_text_from_epub(filepath)
             elif file_ext == '.docx':
@@ -154,7 +279,8 @@ class Ingestor:
             elif file_ext == '.xml':
                 with open(filepath, 'r', encoding='utf-8') as f:
                     soup = BeautifulSoup(f.read(), 'xml')
-                    return soup.get_text(separator=' ', strip=True)
+                    # One element's text per line, so passages can follow element boundaries
+                    return soup.get_text(separator='\n', strip=True)
             else:
                 raise ValueError(f"Unsupported file format: {file_ext}")
         except Exception as e:
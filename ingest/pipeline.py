@@ -0,0 +1,241 @@
+"""
+This module provides a small staged pipeline for running ingestion work concurrently.
+Stages are connected by bounded queues so that a slow stage applies backpressure to the
+stages in front of it, and each stage reports its throughput and queue depth while running.
+"""
+
+import queue
+import threading
+from tqdm import tqdm
+from typing import Any, Callable, Iterable, List, Optional
+
+
+_DONE = object()
+
+
+class Stage:
+    """
+    A single step of a Pipeline, run by one or more worker threads.
+
+    Attributes:
+        name (str): Name of the stage, used for progress reporting
+        fn (Callable): Function called on every input item, returning an iterable of output items
+        workers (int): Number of worker threads running this stage
+        unit (str): Unit label shown in the progress bar
+        weight (Callable): Function giving how many units an input item counts for
+        inbox (queue.Queue): Bounded queue feeding this stage
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Iterable[Any]],
+        workers: int = 1,
+        unit: str = "item",
+        weight: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        """
+        Initialize a stage.
+
+        Args:
+            name (str): Name of the stage
+            fn (Callable): Function mapping one input item to an iterable of output items
+            workers (int): Number of worker threads for this stage
+            unit (str): Unit label for the progress bar
+            weight (Callable, optional): Function returning how many units an item counts for
+        """
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker, got {workers}")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.unit = unit
+        self.weight = weight or (lambda item: 1)
+        self.inbox = None
+        self.bar = None
+        self._remaining = workers
+        self._lock = threading.Lock()
+
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues.
+
+    Items produced by the source flow through every stage in order. Each stage may emit
+    zero or more items per input item, which lets a stage fan out (e.g. one file into many
+    chunks) or drop items. The first exception raised by any stage stops the pipeline and
+    is re-raised from run().
+
+    Attributes:
+        stages (list): Stages in the order items flow through them
+        queue_size (int): Maximum number of items waiting in front of each stage
+        refresh_interval (float): Seconds between two refreshes of the queue depths shown
+    """
+
+    def __init__(self, queue_size: int = 8, refresh_interval: float = 0.5) -> None:
+        """
+        Initialize an empty pipeline.
+
+        Args:
+            queue_size (int): Capacity of the queue in front of each stage
+            refresh_interval (float): Seconds between two refreshes of the queue depths shown
+        """
+        self.stages: List[Stage] = []
+        self.queue_size = queue_size
+        self.refresh_interval = refresh_interval
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+
+    def add_stage(self, name: str, fn: Callable[[Any], Iterable[Any]], workers: int = 1,
+                  unit: str = "item", weight: Optional[Callable[[Any], int]] = None) -> "Pipeline":
+        """
+        Append a stage to the pipeline.
+
+        Args:
+            name (str): Name of the stage
+            fn (Callable): Function mapping one input item to an iterable of output items
+            workers (int): Number of worker threads for this stage
+            unit (str): Unit label for the progress bar
+            weight (Callable, optional): Function returning how many units an item counts for
+
+        Returns:
+            Pipeline: The pipeline itself, so calls can be chained
+        """
+        self.stages.append(Stage(name, fn, workers, unit, weight))
+        return self
+
+    def run(self, source: Iterable[Any]) -> None:
+        """
+        Feed every item from the source through all stages and wait for completion.
+
+        Args:
+            source (Iterable): Items handed to the first stage
+
+        Raises:
+            Exception: The first exception raised by any stage
+        """
+        if not self.stages:
+            return
+
+        self._stop.clear()
+        self._error = None
+
+        for position, stage in enumerate(self.stages):
+            stage.inbox = queue.Queue(maxsize=self.queue_size)
+            stage._remaining = stage.workers
+            stage.bar = tqdm(desc=f"{stage.name:<8}", unit=stage.unit, position=position, leave=True)
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            outbox = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage, outbox), daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        finished = threading.Event()
+        monitor = threading.Thread(target=self._monitor, args=(finished,), daemon=True)
+        monitor.start()
+
+        first = self.stages[0]
+        try:
+            for item in source:
+                if not self._put(first.inbox, item):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(first.workers):
+                self._put(first.inbox, _DONE)
+
+        for thread in threads:
+            thread.join()
+        finished.set()
+        monitor.join()
+        for stage in self.stages:
+            stage.bar.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def _work(self, stage: Stage, outbox: Optional[Stage]) -> None:
+        """
+        Worker loop: take items from the stage's inbox, process them and pass results on.
+
+        Args:
+            stage (Stage): The stage this worker runs
+            outbox (Stage, optional): The next stage, or None for the last stage
+        """
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                break
+            if self._stop.is_set():
+                continue
+            try:
+                for result in stage.fn(item) or ():
+                    if outbox is not None and not self._put(outbox.inbox, result):
+                        break
+                with stage._lock:
+                    stage.bar.update(stage.weight(item))
+            except BaseException as e:
+                self._fail(e)
+
+        # The last worker of a stage to finish tells every worker of the next stage to stop
+        with stage._lock:
+            stage._remaining -= 1
+            last = stage._remaining == 0
+        if last and outbox is not None:
+            for _ in range(outbox.workers):
+                self._put(outbox.inbox, _DONE)
+
+    def _monitor(self, finished: threading.Event) -> None:
+        """
+        Refresh the queue depth shown for every stage until the pipeline finishes.
+
+        Args:
+            finished (threading.Event): Set once every worker has stopped
+
+        Note:
+            Runs on a timer so the depths stay current while a stage is busy with a long item
+        """
+        while not finished.wait(self.refresh_interval):
+            for stage in self.stages:
+                with stage._lock:
+                    stage.bar.set_postfix(queue=stage.inbox.qsize())
+
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """
+        Put an item on a bounded queue, blocking while it is full.
+
+        Args:
+            target (queue.Queue): Queue to put the item on
+            item (Any): Item to enqueue
+
+        Returns:
+            bool: False if the pipeline was stopped before the item could be enqueued
+
+        Note:
+            Stop markers are always delivered so that workers can shut down after a failure
+        """
+        while True:
+            if self._stop.is_set() and item is not _DONE:
+                return False
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+    def _fail(self, error: BaseException) -> None:
+        """
+        Record the first error and signal every stage to stop.
+
+        Args:
+            error (BaseException): The exception that stopped the pipeline
+        """
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
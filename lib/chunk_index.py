@@ -0,0 +1,177 @@
+"""
+Positional index over the chunks of ingested documents.
+Chunks are stored with IDs of the form '{filename}-chunk-{i}', so the chunks around a
+retrieved hit can be found by position alone, without running further vector queries.
+"""
+import os
+import re
+import json
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+PASSAGE_MAX_CHUNKS = 3
+
+# Passage boundaries per source format, matching the structure each extractor keeps:
+# form feeds between PDF pages, newlines between DOCX paragraphs and XML elements
+PASSAGE_BREAKS = {
+    ".pdf": re.compile(r"\f"),
+    ".docx": re.compile(r"\n"),
+    ".xml": re.compile(r"\n"),
+}
+
+
+def passage_break(filename: str) -> "re.Pattern":
+    """
+    Get the pattern separating passages in text extracted from a file.
+
+    Args:
+        filename (str): Name of the source file
+
+    Returns:
+        re.Pattern: Pattern matching passage boundaries, blank lines for formats without a specific one
+    """
+    return PASSAGE_BREAKS.get(os.path.splitext(filename)[1].lower(), PARAGRAPH_BREAK)
+
+
+def chunk_id(filename: str, ordinal: int) -> str:
+    """
+    Build the ID of a chunk from its source filename and position.
+
+    Args:
+        filename (str): Name of the source file
+        ordinal (int): Position of the chunk within the file
+
+    Returns:
+        str: Chunk ID in the format '{filename}-chunk-{ordinal}'
+    """
+    return f"{filename}-chunk-{ordinal}"
+
+
+def parse_chunk_id(chunk_id: str) -> Tuple[str, int]:
+    """
+    Split a chunk ID back into its source filename and position.
+
+    Args:
+        chunk_id (str): Chunk ID in the format '{filename}-chunk-{ordinal}'
+
+    Returns:
+        tuple: The source filename and the chunk ordinal
+    """
+    filename, ordinal = chunk_id.rsplit("-chunk-", 1)
+    return filename, int(ordinal)
+
+
+class ChunkIndex:
+    """
+    Maps chunk positions to the IDs of neighbouring chunks and enclosing passages.
+
+    For every file the index records the number of chunks and, for each chunk, the first and
+    last chunk of its passage. A passage is the structural unit in which a chunk starts and spans
+    every chunk overlapping that unit. Units depend on the source format: a page for PDF, a
+    paragraph for DOCX, an element's text for XML, and text between blank lines otherwise.
+    Passages are limited to a few chunks on either side of the hit. All lookups are O(1).
+
+    Attributes:
+        files (dict): Per file entries with 'count' and 'passages' keys
+    """
+
+    def __init__(self, files: Optional[Dict[str, Dict]] = None) -> None:
+        """
+        Initialize the index.
+
+        Args:
+            files (dict, optional): Existing per file entries, as produced by to_json()
+        """
+        self.files = files or {}
+
+    def add_file(self, filename: str, text: str, spans: List[Tuple[int, int]]) -> None:
+        """
+        Record the chunks of a file.
+
+        Args:
+            filename (str): Name of the source file, as used in its chunk IDs
+            text (str): Full text the chunks were split from
+            spans (list): Start and end character offsets of each chunk, in order
+        """
+        breaks = [match.end() for match in passage_break(filename).finditer(text)]
+        covered = [(bisect_right(breaks, start), bisect_right(breaks, max(start, end - 1))) for start, end in spans]
+
+        first_of: Dict[int, int] = {}
+        last_of: Dict[int, int] = {}
+        for ordinal, (first_paragraph, last_paragraph) in enumerate(covered):
+            for paragraph in range(first_paragraph, last_paragraph + 1):
+                first_of.setdefault(paragraph, ordinal)
+                last_of[paragraph] = ordinal
+
+        passages = [[first_of[paragraph], last_of[paragraph]] for paragraph, _ in covered]
+        self.files[filename] = {"count": len(spans), "passages": passages}
+
+    def neighbours(self, chunk: str, n: int) -> List[str]:
+        """
+        Get the IDs of a chunk and up to n chunks on either side of it.
+
+        Args:
+            chunk (str): ID of the chunk to expand
+            n (int): Number of neighbours to include on each side
+
+        Returns:
+            list: Chunk IDs in document order, including the chunk itself
+        """
+        n = max(0, n)
+        filename, ordinal = parse_chunk_id(chunk)
+        entry = self.files.get(filename)
+        if entry is None or ordinal >= entry["count"]:
+            return [chunk]
+        first = max(0, ordinal - n)
+        last = min(entry["count"] - 1, ordinal + n)
+        return [chunk_id(filename, i) for i in range(first, last + 1)]
+
+    def passage(self, chunk: str, max_chunks: int = PASSAGE_MAX_CHUNKS) -> List[str]:
+        """
+        Get the IDs of the chunks in the passage enclosing a chunk.
+
+        Args:
+            chunk (str): ID of the chunk to expand
+            max_chunks (int): Maximum number of passage chunks included on each side of the chunk
+
+        Returns:
+            list: Chunk IDs in document order, including the chunk itself
+
+        Note:
+            If the passage covers the whole file, the file has no usable passage structure
+            and only the chunk itself is returned
+        """
+        filename, ordinal = parse_chunk_id(chunk)
+        entry = self.files.get(filename)
+        if entry is None or ordinal >= entry["count"]:
+            return [chunk]
+        first, last = entry["passages"][ordinal]
+        if entry["count"] > 1 and first == 0 and last == entry["count"] - 1:
+            return [chunk]
+        first = max(first, ordinal - max(0, max_chunks))
+        last = min(last, ordinal + max(0, max_chunks))
+        return [chunk_id(filename, i) for i in range(first, last + 1)]
+
+    def to_json(self) -> str:
+        """
+        Serialize the index so it can be stored in collection metadata.
+
+        Returns:
+            str: JSON representation of the index
+        """
+        return json.dumps(self.files, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: Optional[str]) -> "ChunkIndex":
+        """
+        Load an index serialized with to_json().
+
+        Args:
+            data (str, optional): JSON representation of the index
+
+        Returns:
+            ChunkIndex: The loaded index, empty if no data was given
+        """
+        return cls(json.loads(data) if data else None)
@@ -0,0 +1,213 @@
+"""
+Output sinks for streamed model responses.
+This module provides sinks that receive generated tokens as they arrive, so that output is
+shown and persisted incrementally instead of being assembled and written once at the end.
+"""
+import os
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+
+THINK_MARKER = "</think>"
+
+
+def report_path(extension: str = "txt") -> str:
+    """
+    Build a timestamped path for a new report in the 'reports' directory.
+
+    Args:
+        extension (str): File extension without the leading dot
+
+    Returns:
+        str: Path of the form reports/YYYYMMDD_HHMMSS.{extension}
+    """
+    os.makedirs("reports", exist_ok=True)
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join("reports", f"{current_time}.{extension}")
+
+
+class Sink(ABC):
+    """
+    Base class for a destination of streamed tokens.
+    """
+
+    @abstractmethod
+    def write(self, token: str) -> None:
+        """
+        Receive the next token of a response.
+
+        Args:
+            token (str): The token text
+        """
+
+    def close(self) -> None:
+        """
+        Signal the end of the response and release any resources.
+        """
+        pass
+
+
+class TerminalSink(Sink):
+    """
+    Prints tokens to the terminal as they arrive.
+    """
+
+    def write(self, token: str) -> None:
+        print(token, end='', flush=True)
+
+    def close(self) -> None:
+        print("\n\n\n")
+
+
+class FileSink(Sink):
+    """
+    Appends tokens to a file through a buffered writer that is fsynced periodically.
+
+    Attributes:
+        path (str): Path of the output file
+        fsync_interval (float): Minimum number of seconds between two fsyncs
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 2.0) -> None:
+        """
+        Open the output file for writing.
+
+        Args:
+            path (str): Path of the output file
+            fsync_interval (float): Minimum number of seconds between two fsyncs
+        """
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = open(path, "w", encoding="utf-8")
+        self._last_sync = time.monotonic()
+
+    def write(self, token: str) -> None:
+        self._file.write(token)
+        now = time.monotonic()
+        if now - self._last_sync >= self.fsync_interval:
+            self._sync()
+            self._last_sync = now
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._sync()
+        self._file.close()
+        print(f"Report saved to: {self.path}")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class JsonlSink(Sink):
+    """
+    Logs every token as a JSON event, one per line.
+
+    Each event records the generation step the token belongs to, its text and a timestamp.
+    A final 'end' event is written when the sink is closed.
+
+    Attributes:
+        step (str): Name of the generation step being logged
+    """
+
+    def __init__(self, file, step: str) -> None:
+        """
+        Initialize the sink on an already opened text file.
+
+        Args:
+            file: Writable text file shared by every step of a generation
+            step (str): Name of the generation step being logged
+        """
+        self._file = file
+        self.step = step
+
+    def write(self, token: str) -> None:
+        self._log("token", token)
+
+    def close(self) -> None:
+        self._log("end", "")
+        self._file.flush()
+
+    def _log(self, event: str, text: str) -> None:
+        record = {"time": time.time(), "step": self.step, "event": event, "text": text}
+        self._file.write(json.dumps(record) + "\n")
+
+
+class ThinkFilter(Sink):
+    """
+    Strips the '<think>' section from a token stream before passing it on.
+
+    Everything up to and including the first '</think>' marker is dropped. Tokens are held
+    back only until the marker is found; afterwards they are passed straight through. If the
+    stream ends without a marker, the held back tokens are passed on unchanged.
+
+    Attributes:
+        sink (Sink): Sink receiving the filtered tokens
+    """
+
+    def __init__(self, sink: Sink) -> None:
+        """
+        Initialize the filter.
+
+        Args:
+            sink (Sink): Sink receiving the filtered tokens
+        """
+        self.sink = sink
+        self._held: List[str] = []
+        self._tail = ""
+        self._found = False
+
+    def write(self, token: str) -> None:
+        if self._found:
+            self.sink.write(token)
+            return
+
+        # Only the end of the previous tokens is kept, so a marker split across tokens is still found
+        window = self._tail + token
+        index = window.find(THINK_MARKER)
+        if index != -1:
+            self._found = True
+            self._held = []
+            rest = window[index + len(THINK_MARKER):]
+            if rest:
+                self.sink.write(rest)
+            return
+
+        self._held.append(token)
+        self._tail = window[-(len(THINK_MARKER) - 1):]
+
+    def close(self) -> None:
+        if not self._found and self._held:
+            self.sink.write("".join(self._held))
+        self._held = []
+        self.sink.close()
+
+
+class MultiSink(Sink):
+    """
+    Forwards every token to several sinks.
+
+    Attributes:
+        sinks (list): Sinks receiving the tokens
+    """
+
+    def __init__(self, sinks: Optional[List[Sink]] = None) -> None:
+        """
+        Initialize with a list of sinks.
+
+        Args:
+            sinks (list, optional): Sinks receiving the tokens
+        """
+        self.sinks = list(sinks or [])
+
+    def write(self, token: str) -> None:
+        for sink in self.sinks:
+            sink.write(token)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
@@ -3,33 +3,145 @@ Utility functions for text extraction from various document formats and data con
 This module provides helper functions for handling PDF, EPUB, DOCX files and ChromaDB data formatting.
 """
 import os
+import time
 import pdfplumber
-from datetime import datetime
 import ebooklib
 from ebooklib import epub
 from docx import Document
-from typing import Dict, List, Any
+from pdfminer.pdftypes import PDFStream, resolve1
+from tqdm import tqdm
+from concurrent.futures import Executor
+from statistics import median
+from typing import Dict, List, Any, Optional, Tuple
 
 
-def extract_text_from_pdf(filepath: str) -> str:
+PAGE_BREAK = "\f"
+
+
+def _has_text_layer(resources: Any, depth: int = 0) -> bool:
+    """
+    Check whether page resources declare any font, without parsing the page content.
+
+    Args:
+        resources: Resource dictionary of a page or form XObject
+        depth (int): Nesting level of form XObjects already followed
+
+    Returns:
+        bool: True if a font is declared, directly or in a nested form XObject
+
+    Note:
+        Text can only be drawn with a font, so pages without one (empty or image-only
+        pages, such as unprocessed scans) have no text layer
+    """
+    resources = resolve1(resources)
+    if not isinstance(resources, dict):
+        return False
+    if resolve1(resources.get("Font")):
+        return True
+    if depth >= 5:
+        return False
+
+    xobjects = resolve1(resources.get("XObject"))
+    if not isinstance(xobjects, dict):
+        return False
+    for xobject in xobjects.values():
+        xobject = resolve1(xobject)
+        if isinstance(xobject, PDFStream) and getattr(resolve1(xobject.get("Subtype")), "name", None) == "Form":
+            if _has_text_layer(xobject.get("Resources"), depth + 1):
+                return True
+    return False
+
+
+def _extract_pdf_pages(filepath: str, start: int, end: int) -> List[Tuple[int, str, float]]:
+    """
+    Extract text from a range of pages of a PDF file.
+
+    Args:
+        filepath (str): Path to the PDF file
+        start (int): Index of the first page to extract
+        end (int): Index one past the last page to extract
+
+    Returns:
+        list: Tuples of page index, page text and seconds spent on the page
+
+    Note:
+        Only the pages in the range are loaded. Pages whose resources declare no font are
+        skipped without parsing their content stream, and return empty text
+    """
+    pages = []
+    with pdfplumber.open(filepath, pages=range(start + 1, end + 1)) as pdf:
+        for page in pdf.pages:
+            started = time.perf_counter()
+            text = ""
+            if _has_text_layer(page.page_obj.resources):
+                text = page.extract_text() or ""
+            pages.append((page.page_number - 1, text, time.perf_counter() - started))
+            page.close()
+    return pages
+
+
+def extract_text_from_pdf(filepath: str, executor: Optional[Executor] = None, pages_per_shard: int = 50) -> str:
     """
     Extract text content from a PDF file.
 
     Args:
         filepath (str): Path to the PDF file
+        executor (Executor, optional): Process pool to extract page ranges in, shared between files
+        pages_per_shard (int): Number of pages handed to the executor at a time
 
     Returns:
-        str: Extracted text content from all pages concatenated together
+        str: Extracted text content from all pages, separated by form feeds (PAGE_BREAK)
 
     Note:
-        Uses pdfplumber for extraction, handling empty pages by returning empty string
+        Uses pdfplumber for extraction, handling empty pages by returning empty string.
+        If an executor is given, PDFs longer than one shard are split into contiguous page
+        ranges extracted in parallel; otherwise all pages are extracted in the current process.
+        Pages that take far longer than the median page are reported once extraction is done.
     """
-    text = ""
     with pdfplumber.open(filepath) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    
-    return text
+        # Read the count from the page tree instead of building every page
+        page_count = int(resolve1(resolve1(pdf.doc.catalog["Pages"]).get("Count", 0)))
+
+    shards = max(1, page_count // pages_per_shard) if executor is not None else 1
+    bounds = [page_count * i // shards for i in range(shards + 1)]
+
+    if shards == 1:
+        pages = _extract_pdf_pages(filepath, 0, page_count)
+    else:
+        futures = [executor.submit(_extract_pdf_pages, filepath, start, end) for start, end in zip(bounds, bounds[1:])]
+        pages = [page for future in futures for page in future.result()]
+
+    _report_pdf_timings(filepath, pages)
+
+    return PAGE_BREAK.join(text for _, text, _ in pages)
+
+
+def _report_pdf_timings(filepath: str, pages: List[Tuple[int, str, float]], factor: float = 5.0, min_seconds: float = 0.5) -> None:
+    """
+    Report pages without text and pages whose extraction took much longer than the median page.
+
+    Args:
+        filepath (str): Path to the PDF file, used in the report
+        pages (list): Tuples of page index, page text and seconds spent on the page
+        factor (float): How many times slower than the median a page must be to be reported
+        min_seconds (float): Minimum time a page must take to be reported
+
+    Note:
+        Uses tqdm.write so the report does not break the ingestion progress bars
+    """
+    if not pages:
+        return
+
+    filename = os.path.basename(filepath)
+    empty = sum(1 for _, text, _ in pages if not text)
+    if empty:
+        tqdm.write(f"No text found on {empty} of {len(pages)} pages in {filename}")
+
+    threshold = max(factor * median(seconds for _, _, seconds in pages), min_seconds)
+    slow = sorted((page for page in pages if page[2] > threshold), key=lambda page: page[2], reverse=True)
+    if slow:
+        listed = ", ".join(f"{index + 1} ({seconds:.2f}s)" for index, _, seconds in slow[:5])
+        tqdm.write(f"Slow pages in {filename}: {listed}")
 
 
 def extract_text_from_epub(filepath: str) -> str:
@@ -98,27 +210,3 @@ def convert_rag_to_string(context_dict: Dict[str, List[List[str]]]) -> str:
         context_string += formatted
 
     return context_string
-
-
-def write_to_file(report: str) -> None:
-    """
-    Writes the generated report to a timestamped text file.
-
-    Args:
-        report (str): The generated report content to save
-
-    Note:
-        Files are saved in the 'reports' directory with timestamp-based names
-        Format: YYYYMMDD_HHMMSS.txt
-    """
-    os.makedirs("reports", exist_ok=True)
-
-    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{current_time}.txt"
-
-    file_path = os.path.join("reports", filename)
-
-    with open(file_path, "w", encoding="utf-8") as file:
-        file.write(report)
-
-    print(f"Report saved to: {file_path}")
\ No newline at end of file
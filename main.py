@@ -3,8 +3,21 @@ from ingest.ingestion import Ingestor
 from generate.generation import Generator
 import chromadb
 
-def ingest(dir_path, name):
-    directory_ingestor = Ingestor(dir_path, name)
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a non-negative integer")
+    return number
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def ingest(dir_path, name, **settings):
+    directory_ingestor = Ingestor(dir_path, name, **settings)
     directory_ingestor.process_directory()
 
 
@@ -26,13 +39,13 @@ def test_query(name, query):
     print(results)
     print("\n\n")
 
-def generate(prompt, name):
+def generate(prompt, name, event_log=False, neighbours=0, passages=False):
     client = chromadb.PersistentClient()
     try:
         collection = client.get_collection(name=name)
     except:
         raise Exception(f"Collection of name {name} does not exist")
-    generator = Generator(prompt, name)
+    generator = Generator(prompt, name, event_log=event_log, neighbours=neighbours, passages=passages)
     generator.generate()
 
 
@@ -56,6 +69,31 @@ def main():
         required=True,
         help="Document collection name."
     )
+    for stage, default in (("extract", 2), ("split", 1), ("embed", 1), ("write", 1)):
+        process_parser.add_argument(
+            f"--{stage}-workers",
+            type=positive_int,
+            default=default,
+            help=f"Number of threads running the {stage} stage."
+        )
+    process_parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=64,
+        help="Number of chunks embedded and written together."
+    )
+    process_parser.add_argument(
+        "--queue-size",
+        type=positive_int,
+        default=8,
+        help="Maximum number of items waiting between two pipeline stages."
+    )
+    process_parser.add_argument(
+        "--pdf-workers",
+        type=positive_int,
+        default=None,
+        help="Number of processes extracting pages of large PDFs (default: CPU count, at most 4)."
+    )
 
     process_parser = subparsers.add_parser("test_query", help="Test a query on Chroma")
     process_parser.add_argument(
@@ -80,6 +118,22 @@ def main():
         required=True,
         help="Prompt for generation."
     )
+    process_parser.add_argument(
+        "--event-log",
+        action="store_true",
+        help="Log every generated token to a JSONL file next to the report."
+    )
+    process_parser.add_argument(
+        "--neighbours",
+        type=non_negative_int,
+        default=0,
+        help="Number of neighbouring chunks added on each side of every retrieved chunk."
+    )
+    process_parser.add_argument(
+        "--passages",
+        action="store_true",
+        help="Expand every retrieved chunk to its enclosing passage."
+    )
 
 
     args = parser.parse_args()
@@ -90,13 +144,23 @@ def main():
         return
 
     if args.command == "ingest":
-        ingest(args.dir, args.name)
+        ingest(
+            args.dir,
+            args.name,
+            extract_workers=args.extract_workers,
+            split_workers=args.split_workers,
+            embed_workers=args.embed_workers,
+            write_workers=args.write_workers,
+            batch_size=args.batch_size,
+            queue_size=args.queue_size,
+            pdf_workers=args.pdf_workers
+        )
 
     if args.command == "test_query":
         test_query(args.name, args.query)
     
     if args.command == "generate":
-        generate(args.prompt, args.name)
+        generate(args.prompt, args.name, args.event_log, args.neighbours, args.passages)
 
 
 if __name__ == "__main__":